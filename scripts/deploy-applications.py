@@ -4,18 +4,118 @@ Kubernetes Applications Deployment Script
 Complete deployment of storage, monitoring, and ingress with full automation
 """
 
+import base64
+import copy
+import functools
+import hashlib
 import json
 import os
 import requests
+import shutil
+import tempfile
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
 import subprocess
 import sys
+import threading
 import time
 import yaml
-import tempfile
 import argparse
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer orjson for JSON parsing, falling back to the standard library
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    from dotenv import dotenv_values
+except ImportError:
+    dotenv_values = None
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+try:
+    from kubernetes import client as k8s_client, config as k8s_config
+    from kubernetes.dynamic import DynamicClient
+except ImportError:
+    DynamicClient = None
+
+# Prefer the libyaml C bindings for manifest (de)serialization, falling back to pure Python
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Connections the in-process kubernetes client keeps to the apiserver; the client's default scales with
+# CPU count, which on small runners is below the node patches and watches that run at the same time
+KUBE_API_POOL_SIZE = 32
+
+# stderr fragments of apiserver connectivity blips that are worth retrying (never NotFound/AlreadyExists)
+TRANSIENT_API_ERRORS = (
+    "Unable to connect to the server",
+    "connection refused",
+    "i/o timeout",
+    "TLS handshake timeout",
+    "ServiceUnavailable",
+    "the server is currently unable to handle the request"
+)
+RETRY_DELAYS = (0.25, 0.5, 1, 2)
+
+# ArgoCD health states that count as deployed once an application is Synced
+SETTLED_HEALTH = frozenset({'Healthy', 'Progressing'})
+
+# ArgoCD API, served over HTTP by the ingress
+ARGOCD_URL = "http://argocd.apps.sddc.info"
+
+# Partial ArgoCD Application spec that turns on automated sync (applied server-side)
+AUTO_SYNC_SPEC = {"syncPolicy": {"automated": {"prune": True, "selfHeal": True}}}
+
+# kube-prometheus-stack values shared by every install; persistence and the admin password are filled in per run
+MONITORING_VALUES_BASE = {
+    'prometheus': {
+        'prometheusSpec': {
+            'retention': '15d',
+            'resources': {
+                'requests': {'cpu': '200m', 'memory': '1Gi'},
+                'limits': {'cpu': '1000m', 'memory': '2Gi'}
+            }
+        }
+    },
+    'grafana': {
+        'enabled': True,
+        'persistence': {'enabled': False},
+        'service': {
+            'type': 'LoadBalancer',
+            'port': 80,
+            'annotations': {'metallb.universe.tf/loadBalancerIPs': '10.10.1.50'}
+        },
+        'grafana.ini': {
+            'server': {
+                'domain': 'grafana.apps.sddc.info',
+                'root_url': 'http://grafana.apps.sddc.info/'
+            },
+            'users': {'allow_sign_up': False}
+        }
+    },
+    'alertmanager': {
+        'enabled': True,
+        'alertmanagerSpec': {
+            'service': {
+                'type': 'LoadBalancer',
+                'annotations': {'metallb.universe.tf/loadBalancerIPs': '10.10.1.51'}
+            }
+        }
+    }
+}
 
 
 class ApplicationsDeployer:
@@ -23,6 +123,7 @@ class ApplicationsDeployer:
                  skip_prerequisites=False, verbose=False):
         self.project_dir = Path(__file__).parent.parent
         self.applications_dir = self.project_dir / "applications"
+        self.manifest_index = self.index_manifests()
         self.max_retries = 3
         
         # Mode flags
@@ -36,21 +137,59 @@ class ApplicationsDeployer:
         self.proxmox_env_file = self.project_dir / '.proxmox-csi.env'
         self.proxmox_env_template = self.project_dir / '.proxmox-csi.env.template'
         self.dns_config_script = self.project_dir / "scripts" / "deploy-dns-config.py"
+        self.manifest_cache_dir = Path.home() / ".cache" / "sddc"
         
-        # Timing tracking
+        # Timing tracking (phases may run on worker threads)
         self.start_time = None
         self.phase_times = {}
+        self.phase_lock = threading.Lock()
         
-        # Proxmox configuration
+        # Proxmox configuration, and the background check_proxmox_config future started by deploy()
         self.proxmox_config = {}
+        self.proxmox_check = None
+        # Proxmox API session with token auth and TLS verification set once, built by proxmox_api()
+        self.pve = None
+        
+        # Read-only cluster lookups memoized as key -> (timestamp, value); one lock per key so
+        # concurrent phases asking for the same lookup fetch it once
+        self.query_cache = {}
+        self.query_locks = {}
         
-        # Application components
+        # In-process Kubernetes API client, created on first use when the kubernetes package is installed
+        self.k8s = None
+        self.k8s_lock = threading.Lock()
+        
+        # Environment for argocd CLI calls: server and TLS options resolved once instead of flags on
+        # every call, and the CLI's stored login (or an inherited ARGOCD_AUTH_TOKEN) used for auth
+        self.argocd_env = dict(os.environ, ARGOCD_SERVER="localhost:8080", ARGOCD_OPTS="--insecure")
+        
+        # Shared HTTP session so ArgoCD and manifest downloads reuse pooled keep-alive connections
+        self.http = requests.Session()
+        http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                   max_retries=Retry(total=3, backoff_factor=0.2))
+        self.http.mount("http://", http_adapter)
+        self.http.mount("https://", http_adapter)
+        # ArgoCD gets its own pool, sized so the concurrent sync requests never wait for or discard a connection
+        self.http.mount(ARGOCD_URL, HTTPAdapter(pool_connections=1, pool_maxsize=16,
+                                                max_retries=Retry(total=3, backoff_factor=0.2)))
+        
+        # Application components, applied in this order by a single kubectl invocation
         self.monitoring_components = [
-            "applications/monitoring/kube-prometheus-stack.yml",
-            "applications/monitoring/redfish-exporter.yml",
-            "applications/monitoring/hardware-graphs-dashboard.yml"
+            "monitoring/kube-prometheus-stack.yml",  # monitoring namespace + ArgoCD application
+            "monitoring/redfish-exporter.yml",
+            "monitoring/hardware-graphs-dashboard.yml"
         ]
         
+        # Resolved once; components missing on disk are reported when the monitoring phase starts
+        self.monitoring_component_paths = []
+        self.missing_monitoring_components = []
+        for component in self.monitoring_components:
+            component_path = self.manifest_index.get(component)
+            if component_path:
+                self.monitoring_component_paths.append(component_path)
+            else:
+                self.missing_monitoring_components.append(component)
+        
         # Standard password for all applications
         self.standard_password = os.environ.get("K8S_APP_PASSWORD")
         if self.standard_password is None:
@@ -63,6 +202,24 @@ class ApplicationsDeployer:
             "ingress/application-ingresses.yml"
         ]
 
+    def index_manifests(self):
+        """Map every manifest under applications/ by its relative path, from a single directory walk"""
+        index = {}
+        pending = [(self.applications_dir, "")]
+        while pending:
+            directory, prefix = pending.pop()
+            try:
+                entries = os.scandir(directory)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append((entry.path, f"{prefix}{entry.name}/"))
+                    elif entry.name.endswith(('.yml', '.yaml')):
+                        index[f"{prefix}{entry.name}"] = Path(entry.path)
+        return index
+
     def log(self, message, level="INFO"):
         """Enhanced logging with timestamps"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -77,8 +234,11 @@ class ApplicationsDeployer:
                 prefix = f"\033[94m[{timestamp}] {level}:\033[0m" if level == "PHASE" else f"[{timestamp}] {level}:"
                 print(f"{prefix} {message}")
 
-    def run_command(self, cmd, description="", check=True, cwd=None, timeout=300):
-        """Execute shell command with comprehensive error handling"""
+    def run_command(self, cmd, description="", check=True, cwd=None, timeout=300, input=None, capture=True, env=None):
+        """Execute shell command with comprehensive error handling
+        
+        capture=False discards stdout (streams it in verbose mode) for callers that only need the exit status.
+        """
         if isinstance(cmd, str):
             cmd_str = cmd
             shell = True
@@ -89,15 +249,32 @@ class ApplicationsDeployer:
         self.log(f"Executing: {description if description else cmd_str}", "DEBUG" if not self.verbose else "INFO")
         
         try:
-            result = subprocess.run(
-                cmd, 
-                cwd=cwd, 
-                capture_output=True, 
-                text=True, 
-                check=check,
-                timeout=timeout,
-                shell=shell
-            )
+            # Transient apiserver failures of kubectl calls are retried with exponential backoff before
+            # being reported; anything else (helm install --wait, ssh, installers) runs exactly once
+            delays = RETRY_DELAYS if not shell and cmd[0] == 'kubectl' else ()
+            for delay in delays + (None,):
+                try:
+                    result = subprocess.run(
+                        cmd, 
+                        cwd=cwd, 
+                        input=input,
+                        stdout=subprocess.PIPE if capture else (None if self.verbose else subprocess.DEVNULL),
+                        stderr=subprocess.PIPE,
+                        text=True, 
+                        timeout=timeout,
+                        shell=shell,
+                        env=env
+                    )
+                except FileNotFoundError as e:
+                    # Report a missing binary the way the shell would
+                    result = subprocess.CompletedProcess(cmd, 127, stdout="", stderr=str(e))
+                if result.returncode == 0 or delay is None or not any(err in result.stderr for err in TRANSIENT_API_ERRORS):
+                    break
+                self.log(f"Transient API error, retrying in {delay}s: {cmd_str}", "DEBUG")
+                time.sleep(delay)
+            
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
             
             if self.verbose and result.stdout:
                 print(result.stdout)
@@ -119,17 +296,258 @@ class ApplicationsDeployer:
                 raise
             return e
 
+    def apply_manifests(self, manifest_paths, description):
+        """Apply manifests in order with one kubectl invocation
+        
+        On failure the manifests are re-applied one at a time so the error names the broken file.
+        """
+        if not manifest_paths:
+            return
+        args = [arg for path in manifest_paths for arg in ('-f', str(path))]
+        result = self.run_command(['kubectl', 'apply', *args], description, check=False, capture=False)
+        if result.returncode == 0:
+            return
+        
+        self.log("Batched apply failed, applying manifests one at a time...", "WARNING")
+        for path in manifest_paths:
+            self.run_command(['kubectl', 'apply', '-f', str(path)], f"Deploy {path.name}", capture=False)
+
+    def kube_client(self):
+        """Return the in-process dynamic client, authenticating from kubeconfig on first use"""
+        # Phases run on worker threads; the lock keeps them from each building a client and discovery cache
+        with self.k8s_lock:
+            if self.k8s is None:
+                configuration = k8s_client.Configuration()
+                k8s_config.load_kube_config(client_configuration=configuration)
+                configuration.connection_pool_maxsize = KUBE_API_POOL_SIZE
+                self.k8s = DynamicClient(k8s_client.ApiClient(configuration))
+            return self.k8s
+
+    def get_resources(self, kind, api_version="v1", namespace=None, label_selector=None, description=""):
+        """List resources as plain dicts, or None if they can't be listed
+        
+        Goes through the in-process kubernetes client (authenticated once per run) when it is
+        installed, otherwise through kubectl -o json.
+        """
+        if DynamicClient is not None:
+            try:
+                resource = self.kube_client().resources.get(api_version=api_version, kind=kind)
+                return resource.get(namespace=namespace, label_selector=label_selector).to_dict().get('items', [])
+            except Exception as e:
+                self.log(f"{description or f'List {kind}'} failed: {str(e)}", "DEBUG")
+                return None
+        
+        group = api_version.rpartition('/')[0]
+        cmd = ['kubectl', 'get', f"{kind.lower()}.{group}" if group else kind.lower(), '-o', 'json']
+        cmd += ['-n', namespace] if namespace else ['-A']
+        cmd += ['-l', label_selector] if label_selector else []
+        result = self.run_command(cmd, description or f"List {kind}", check=False)
+        if result.returncode != 0:
+            return None
+        return json_loads(result.stdout).get('items', [])
+
+    def patch_resource(self, kind, name, body, api_version="v1", namespace=None, description=""):
+        """Merge-patch one resource; returns whether it succeeded
+        
+        Same client selection as get_resources: in-process when installed, otherwise kubectl patch.
+        """
+        if DynamicClient is not None:
+            try:
+                resource = self.kube_client().resources.get(api_version=api_version, kind=kind)
+                resource.patch(body=body, name=name, namespace=namespace,
+                               content_type="application/merge-patch+json")
+                return True
+            except Exception as e:
+                self.log(f"{description or f'Patch {kind} {name}'} failed: {str(e)}", "DEBUG")
+                return False
+        
+        group = api_version.rpartition('/')[0]
+        cmd = ['kubectl', 'patch', f"{kind.lower()}.{group}" if group else kind.lower(), name,
+               '--type', 'merge', '-p', json.dumps(body)]
+        cmd += ['-n', namespace] if namespace else []
+        return self.run_command(cmd, description or f"Patch {kind} {name}", check=False, capture=False).returncode == 0
+
+    def watch_resources(self, kind, api_version="v1", namespace=None, timeout=60):
+        """Yield watch events as {'type': ADDED/MODIFIED/DELETED, 'object': plain dict} as the apiserver pushes them
+        
+        Current state arrives first as ADDED events. Stops after timeout seconds. Uses the in-process
+        client's watch when installed, otherwise streams kubectl get --watch --output-watch-events.
+        """
+        if DynamicClient is not None:
+            client = self.kube_client()
+            resource = client.resources.get(api_version=api_version, kind=kind)
+            for event in client.watch(resource, namespace=namespace, timeout=timeout):
+                yield {'type': event['type'], 'object': event['raw_object']}
+            return
+        
+        group = api_version.rpartition('/')[0]
+        cmd = ['kubectl', 'get', f"{kind.lower()}.{group}" if group else kind.lower(),
+               '--watch', '--output-watch-events', '-o', 'json']
+        cmd += ['-n', namespace] if namespace else ['-A']
+        self.log(f"Executing: watch {' '.join(cmd[2:4])}", "DEBUG" if not self.verbose else "INFO")
+        
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            # kubectl prints each event as indented JSON, closed by a '}' in the first column
+            lines = []
+            for line in proc.stdout:
+                lines.append(line)
+                if line.rstrip('\n') == '}':
+                    yield json_loads(''.join(lines))
+                    lines = []
+        finally:
+            timer.cancel()
+            proc.kill()
+            proc.wait()
+
+    def cached(self, key, ttl, fetch, negative_ttl=0):
+        """Return fetch() memoized under key for ttl seconds
+        
+        Falsy results are only kept for negative_ttl seconds, which defaults to not caching them so
+        polling callers always see the change they are waiting for.
+        """
+        with self.query_locks.setdefault(key, threading.RLock()):
+            entry = self.query_cache.get(key)
+            if entry and time.monotonic() - entry[0] < (ttl if entry[1] else negative_ttl):
+                return entry[1]
+            value = fetch()
+            if value or negative_ttl:
+                self.query_cache[key] = (time.monotonic(), value)
+            return value
+
+    def wait_until(self, check, timeout=60, interval=0.5, backoff=1, max_interval=10):
+        """Poll check() until it returns something truthy; returns that value, or None on timeout
+        
+        With backoff > 1 the interval grows by that factor after every miss, up to max_interval.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            value = check()
+            remaining = deadline - time.monotonic()
+            if value or remaining <= 0:
+                return value or None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * backoff, max_interval)
+
+    def watch_until_ready(self, kind, api_version, names, ready, namespace=None, timeout=60):
+        """Block on a watch until ready(obj) holds for every named object; returns False on timeout
+        
+        Returns as soon as the apiserver pushes the last change instead of polling for it.
+        """
+        pending = set(names)
+        self.log(f"Watching {kind} {', '.join(sorted(pending))} until ready", "DEBUG")
+        try:
+            for event in self.watch_resources(kind, api_version, namespace=namespace, timeout=timeout):
+                obj = event['object']
+                name = obj.get('metadata', {}).get('name')
+                if event['type'] != 'DELETED' and name in pending and ready(obj):
+                    pending.discard(name)
+                    if not pending:
+                        return True
+        except Exception as e:
+            self.log(f"Watch on {kind} failed: {str(e)}", "DEBUG")
+        return False
+
+    @staticmethod
+    def has_condition(obj, condition):
+        """True if obj's status reports the given condition type as True"""
+        return any(c.get('type') == condition and c.get('status') == 'True'
+                   for c in obj.get('status', {}).get('conditions') or [])
+
+    def wait_for_deployment(self, name, namespace, timeout=300):
+        """Wait on a watch until the Deployment reports Available=True; returns False on timeout"""
+        return self.watch_until_ready("Deployment", "apps/v1", [name],
+                                      lambda deployment: self.has_condition(deployment, 'Available'),
+                                      namespace=namespace, timeout=timeout)
+
+    def invalidate(self, *keys):
+        """Drop cached query results after changing the objects behind them"""
+        for key in keys:
+            self.query_cache.pop(key, None)
+
+    def ingress_count(self):
+        """Count ingress resources across all namespaces (cached for 30s)"""
+        return self.cached(
+            "ingresses", 30,
+            lambda: len(self.get_resources("Ingress", "networking.k8s.io/v1",
+                                           description="Count ingress resources") or [])
+        )
+
+    def storage_class_count(self):
+        """Count storage classes (cached for 5 minutes so verification and the summary share one lookup)"""
+        return self.cached(
+            "storageclasses", 300,
+            lambda: len(self.get_resources("StorageClass", "storage.k8s.io/v1",
+                                           description="Count storage classes") or [])
+        )
+
+    def storage_class_available(self):
+        """Check for the proxmox-rbd storage class (cached once it exists)"""
+        return self.cached(
+            "storageclass/proxmox-rbd", float("inf"),
+            lambda: self.run_command(['kubectl', 'get', 'storageclass', 'proxmox-rbd'],
+                                     "Check storage class", check=False).returncode == 0
+        )
+
+    def get_ingress_ip(self):
+        """Return the NGINX Ingress LoadBalancer IP, or 'pending' (cached once assigned)"""
+        def fetch():
+            result = self.run_command(['kubectl', 'get', 'svc', '-n', 'ingress-nginx', '-o',
+                                      'jsonpath={.items[0].status.loadBalancer.ingress[0].ip}'],
+                                     "Get NGINX Ingress LoadBalancer IP", check=False)
+            return result.stdout.strip() if result.returncode == 0 and result.stdout else None
+        return self.cached("ingress-ip", float("inf"), fetch) or "pending"
+
+    def fetch_manifest(self, url):
+        """Download an upstream manifest, revalidating a local ETag cache instead of refetching
+        
+        Falls back to the cached copy if the download fails; returns None if neither is available.
+        """
+        cache_key = hashlib.sha256(url.encode()).hexdigest()
+        body_file = self.manifest_cache_dir / f"{cache_key}.yml"
+        etag_file = self.manifest_cache_dir / f"{cache_key}.etag"
+        
+        headers = {}
+        if body_file.exists() and etag_file.exists():
+            headers['If-None-Match'] = etag_file.read_text()
+        
+        try:
+            response = self.http.get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                self.log(f"Using cached manifest for {url}")
+                return body_file.read_text()
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if body_file.exists():
+                self.log(f"Download failed ({e}), using cached manifest for {url}", "WARNING")
+                return body_file.read_text()
+            self.log(f"Failed to download {url}: {e}", "ERROR")
+            return None
+        
+        self.manifest_cache_dir.mkdir(parents=True, exist_ok=True)
+        body_file.write_text(response.text)
+        if response.headers.get('ETag'):
+            etag_file.write_text(response.headers['ETag'])
+        else:
+            etag_file.unlink(missing_ok=True)
+        return response.text
+
     def start_phase_timer(self, phase_name):
         """Start timing a deployment phase"""
-        self.phase_times[phase_name] = {"start": time.time()}
+        with self.phase_lock:
+            self.phase_times[phase_name] = {"start": time.time()}
         self.log(f"Starting {phase_name}", "PHASE")
 
     def end_phase_timer(self, phase_name):
         """End timing a deployment phase"""
-        if phase_name in self.phase_times:
+        with self.phase_lock:
+            if phase_name not in self.phase_times:
+                return
             duration = time.time() - self.phase_times[phase_name]["start"]
             self.phase_times[phase_name]["duration"] = duration
-            self.log(f"Completed {phase_name} in {duration:.1f}s", "SUCCESS")
+        self.log(f"Completed {phase_name} in {duration:.1f}s", "SUCCESS")
 
     # ================== Prerequisites and Setup ==================
 
@@ -138,22 +556,30 @@ class ApplicationsDeployer:
         self.start_phase_timer("Prerequisites Check")
         
         try:
-            # Check kubectl connectivity
+            # Check connectivity and node readiness with the one node listing that labeling reuses later
             self.log("Checking Kubernetes cluster connectivity...")
-            result = self.run_command("kubectl cluster-info", "Check cluster connectivity")
+            nodes = self.cached("nodes", 300, lambda: self.get_resources('Node', description="Check node status"))
+            if nodes is None:
+                raise RuntimeError("Cannot reach the Kubernetes API server")
             
-            # Check if nodes are ready
             self.log("Verifying node readiness...")
-            result = self.run_command("kubectl get nodes --no-headers | awk '{print $2}' | grep -v Ready || true", 
-                                    "Check node status")
-            if result.stdout.strip():
+            not_ready = [
+                node['metadata']['name'] for node in nodes or []
+                if not any(c['type'] == 'Ready' and c['status'] == 'True'
+                           for c in node.get('status', {}).get('conditions', []))
+            ]
+            if not_ready:
                 self.log("Some nodes are not ready. Proceeding with caution...", "WARNING")
             
             # Check ArgoCD installation
             self.log("Checking ArgoCD installation...")
-            result = self.run_command("kubectl get namespace argocd", 
-                                    "Check ArgoCD namespace", check=False)
-            if result.returncode != 0:
+            argocd_installed = self.cached(
+                "namespace/argocd", 60,
+                lambda: self.run_command(['kubectl', 'get', 'namespace', 'argocd'],
+                                         "Check ArgoCD namespace", check=False).returncode == 0,
+                negative_ttl=60
+            )
+            if not argocd_installed:
                 self.log("ArgoCD not found. Installing ArgoCD...", "WARNING")
                 self.install_argocd()
             else:
@@ -169,60 +595,70 @@ class ApplicationsDeployer:
         """Install ArgoCD for GitOps deployment"""
         self.log("Installing ArgoCD...")
         
-        # Create ArgoCD namespace and install
-        self.run_command("kubectl create namespace argocd --dry-run=client -o yaml | kubectl apply -f -",
-                        "Create ArgoCD namespace")
+        # Create ArgoCD namespace and install - a plain create that tolerates an existing
+        # namespace, instead of rendering it with a client dry-run and piping that to apply
+        result = self.run_command(['kubectl', 'create', 'namespace', 'argocd'],
+                                 "Create ArgoCD namespace", check=False)
+        if result.returncode != 0 and "AlreadyExists" not in result.stderr:
+            raise RuntimeError(f"Could not create the argocd namespace: {result.stderr.strip()}")
+        self.invalidate("namespace/argocd")
         
         # Install ArgoCD
-        self.run_command(
-            "kubectl apply -n argocd -f https://raw.githubusercontent.com/argoproj/argo-cd/stable/manifests/install.yaml",
-            "Install ArgoCD"
-        )
+        manifest = self.fetch_manifest("https://raw.githubusercontent.com/argoproj/argo-cd/stable/manifests/install.yaml")
+        if manifest is None:
+            raise RuntimeError("Could not download the ArgoCD install manifest")
+        self.run_command(['kubectl', 'apply', '-n', 'argocd', '-f', '-'], "Install ArgoCD", input=manifest, capture=False)
         
         # Wait for ArgoCD to be ready
         self.log("Waiting for ArgoCD to be ready...")
-        self.run_command("kubectl wait --for=condition=available --timeout=300s deployment/argocd-server -n argocd",
-                        "Wait for ArgoCD server")
+        if not self.wait_for_deployment('argocd-server', 'argocd'):
+            raise RuntimeError("ArgoCD server did not become available within 300s")
         
         self.log("ArgoCD installed successfully", "SUCCESS")
     
+    def argocd_initial_password(self):
+        """Return the generated admin password from argocd-initial-admin-secret, or None if it is gone"""
+        result = self.run_command(
+            ['kubectl', '-n', 'argocd', 'get', 'secret', 'argocd-initial-admin-secret', '-o', 'jsonpath={.data.password}'],
+            "Get current ArgoCD password",
+            check=False
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        return base64.b64decode(result.stdout.strip()).decode().strip()
+
     def update_argocd_password(self):
         """Update ArgoCD admin password to standard password"""
+        if bcrypt is not None:
+            self.patch_argocd_password()
+            return
+        
         try:
             self.log("Setting ArgoCD admin password...")
             
             # Get current admin password from secret
-            result = self.run_command(
-                "kubectl -n argocd get secret argocd-initial-admin-secret -o jsonpath='{.data.password}' | base64 -d",
-                "Get current ArgoCD password",
-                check=False
-            )
-            
-            if result.returncode != 0:
+            current_password = self.argocd_initial_password()
+            if current_password is None:
                 self.log("ArgoCD initial password secret not found, skipping password update", "WARNING")
                 return
             
-            current_password = result.stdout.strip()
             self.log(f"Current ArgoCD password retrieved", "INFO")
             
             # Use API directly instead of CLI for more reliability
             try:
                 # Get ArgoCD session token
-                import requests
-                import json
-                
                 # Try via ingress first
-                session_url = "http://argocd.apps.sddc.info/api/v1/session"
+                session_url = f"{ARGOCD_URL}/api/v1/session"
                 login_data = {"username": "admin", "password": current_password}
                 
                 self.log("Getting ArgoCD session token via ingress...")
-                response = requests.post(session_url, json=login_data, timeout=10)
+                response = self.http.post(session_url, json=login_data, timeout=10)
                 
                 if response.status_code == 200:
                     token = response.json().get("token")
                     
                     # Update password using API
-                    password_url = "http://argocd.apps.sddc.info/api/v1/account/password"
+                    password_url = f"{ARGOCD_URL}/api/v1/account/password"
                     headers = {"Authorization": f"Bearer {token}"}
                     password_data = {
                         "currentPassword": current_password,
@@ -230,14 +666,14 @@ class ApplicationsDeployer:
                     }
                     
                     self.log("Updating ArgoCD password via API...")
-                    update_response = requests.put(password_url, json=password_data, headers=headers, timeout=10)
+                    update_response = self.http.put(password_url, json=password_data, headers=headers, timeout=10)
                     
                     if update_response.status_code == 200:
                         self.log("ArgoCD admin password updated successfully", "SUCCESS")
                         
                         # Verify new password works
                         verify_data = {"username": "admin", "password": self.standard_password}
-                        verify_response = requests.post(session_url, json=verify_data, timeout=10)
+                        verify_response = self.http.post(session_url, json=verify_data, timeout=10)
                         
                         if verify_response.status_code == 200:
                             self.log("New password verification successful", "SUCCESS")
@@ -258,6 +694,40 @@ class ApplicationsDeployer:
             self.log(f"Failed to update ArgoCD password: {str(e)}", "WARNING")
             self.log("ArgoCD will use the generated password", "INFO")
 
+    def patch_argocd_password(self):
+        """Set the ArgoCD admin password by writing its bcrypt hash straight into argocd-secret"""
+        self.log("Setting ArgoCD admin password...")
+        
+        # Leave the secret alone when it already holds the standard password: a new passwordMtime
+        # would invalidate every UI session and saved argocd CLI login issued before it
+        current = self.run_command(['kubectl', '-n', 'argocd', 'get', 'secret', 'argocd-secret',
+                                    '-o', 'jsonpath={.data.admin\\.password}'],
+                                   "Read ArgoCD admin password hash", check=False)
+        if current.returncode == 0 and current.stdout.strip():
+            try:
+                if bcrypt.checkpw(self.standard_password.encode(), base64.b64decode(current.stdout.strip())):
+                    self.log("ArgoCD admin password already set", "SUCCESS")
+                    return
+            except ValueError:
+                pass
+        
+        # No API login needed, so this works before the ArgoCD ingress is reachable
+        password_hash = bcrypt.hashpw(self.standard_password.encode(), bcrypt.gensalt()).decode()
+        patch = json.dumps({
+            "stringData": {
+                "admin.password": password_hash,
+                "admin.passwordMtime": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            }
+        })
+        result = self.run_command(['kubectl', '-n', 'argocd', 'patch', 'secret', 'argocd-secret', '-p', patch],
+                                 "Patch ArgoCD admin password", check=False)
+        
+        if result.returncode == 0:
+            self.log("ArgoCD admin password updated successfully", "SUCCESS")
+        else:
+            self.log("Failed to update ArgoCD password", "WARNING")
+            self.log("ArgoCD will use the generated password", "INFO")
+
     # ================== Proxmox CSI Storage Integration ==================
 
     def load_proxmox_config(self):
@@ -281,12 +751,16 @@ PROXMOX_INSECURE="true"
             return False
 
         try:
-            with open(self.proxmox_env_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        self.proxmox_config[key] = value.strip('"')
+            if dotenv_values is not None:
+                # python-dotenv also handles export prefixes, quoting and inline comments
+                self.proxmox_config.update(dotenv_values(self.proxmox_env_file))
+            else:
+                with open(self.proxmox_env_file, 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#') and '=' in line:
+                            key, value = line.split('=', 1)
+                            self.proxmox_config[key] = value.strip('"')
             
             self.log("Loaded Proxmox CSI configuration", "SUCCESS")
             return True
@@ -319,25 +793,31 @@ PROXMOX_INSECURE="true"
         self.log("Proxmox configuration validation passed", "SUCCESS")
         return True
 
+    def proxmox_api(self):
+        """Return the Proxmox API session, creating it on first use
+        
+        The session carries the API token header and TLS setting, and its own small keep-alive
+        pool, so every Proxmox request after the first reuses the connection.
+        """
+        if self.pve is None:
+            insecure = self.proxmox_config.get('PROXMOX_INSECURE', 'false').lower() == 'true'
+            if insecure:
+                urllib3.disable_warnings(InsecureRequestWarning)
+            
+            self.pve = requests.Session()
+            self.pve.headers['Authorization'] = (
+                f"PVEAPIToken={self.proxmox_config['PROXMOX_TOKEN_ID']}={self.proxmox_config['PROXMOX_TOKEN_SECRET']}"
+            )
+            self.pve.verify = not insecure
+            self.pve.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                                   max_retries=Retry(total=2, backoff_factor=0.2)))
+        return self.pve
+
     def test_proxmox_connection(self):
         """Test connection to Proxmox using provided credentials"""
         try:
-            import requests
-            from requests.packages.urllib3.exceptions import InsecureRequestWarning
-            
-            if self.proxmox_config.get('PROXMOX_INSECURE', 'false').lower() == 'true':
-                requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-            
-            headers = {
-                'Authorization': f"PVEAPIToken={self.proxmox_config['PROXMOX_TOKEN_ID']}={self.proxmox_config['PROXMOX_TOKEN_SECRET']}"
-            }
-            
-            verify_ssl = self.proxmox_config.get('PROXMOX_INSECURE', 'false').lower() != 'true'
-            
-            response = requests.get(
+            response = self.proxmox_api().get(
                 f"{self.proxmox_config['PROXMOX_URL'].rstrip('/')}/version",
-                headers=headers,
-                verify=verify_ssl,
                 timeout=10
             )
             
@@ -348,23 +828,49 @@ PROXMOX_INSECURE="true"
                 self.log(f"Proxmox API connection failed: HTTP {response.status_code}", "ERROR")
                 return False
                 
-        except ImportError:
-            self.log("requests library not available, skipping connection test", "WARNING")
-            return True
         except Exception as e:
             self.log(f"Failed to test Proxmox connection: {str(e)}", "ERROR")
             return False
 
+    def check_proxmox_config(self):
+        """Load, validate and test the Proxmox CSI configuration
+        
+        Returns "missing", "invalid", "unreachable" or "ok".
+        """
+        if not self.load_proxmox_config():
+            return "missing"
+        if not self.validate_proxmox_config():
+            return "invalid"
+        if not self.test_proxmox_connection():
+            return "unreachable"
+        return "ok"
+
     def setup_proxmox_user(self):
         """Create CSI user and token in Proxmox if needed"""
         parsed_url = urlparse(self.proxmox_config['PROXMOX_URL'])
         proxmox_host = parsed_url.hostname
         
+        # Multiplexed so the setup below reuses the connection opened by the user check; the socket
+        # lives in a private per-run directory and the master is shut down when setup finishes
+        control_dir = tempfile.mkdtemp(prefix="sddc-ssh-")
+        control_path = f"{control_dir}/%C"
+        ssh_cmd = ['ssh', '-o', 'ControlMaster=auto', '-o', 'ControlPersist=60s',
+                   '-o', f'ControlPath={control_path}', f'root@{proxmox_host}']
+        
+        try:
+            self.create_proxmox_csi_user(proxmox_host, ssh_cmd)
+        finally:
+            subprocess.run(['ssh', '-o', f'ControlPath={control_path}', '-O', 'exit', f'root@{proxmox_host}'],
+                           capture_output=True)
+            shutil.rmtree(control_dir, ignore_errors=True)
+
+    def create_proxmox_csi_user(self, proxmox_host, ssh_cmd):
+        """Create the CSI user, role and token over ssh_cmd unless the user already exists"""
         self.log(f"Checking CSI user on Proxmox {proxmox_host}...")
         
         # Check if user exists
         result = self.run_command(
-            f"ssh root@{proxmox_host} 'pveum user list | grep kubernetes-csi@pve || echo NOT_FOUND'",
+            ssh_cmd + ['pveum user list | grep kubernetes-csi@pve || echo NOT_FOUND'],
             "Check CSI user", check=False
         )
         
@@ -378,14 +884,17 @@ PROXMOX_INSECURE="true"
                 "pveum user token add kubernetes-csi@pve csi -privsep 0 --comment 'Kubernetes CSI Plugin Token'"
             ]
             
-            for cmd in commands:
-                result = self.run_command(
-                    f"ssh root@{proxmox_host} \"{cmd}\"",
-                    f"Setup CSI: {cmd[:30]}...", check=False
-                )
-                
-                if result.returncode != 0 and "already exists" not in result.stderr:
-                    self.log(f"Command warning: {result.stderr}", "WARNING")
+            # Run them all as one script in a single SSH session; like separate calls,
+            # a failing command doesn't stop the ones after it
+            result = self.run_command(
+                ssh_cmd + ['sh', '-s'],
+                "Setup CSI user, role and token", check=False,
+                input="\n".join(commands) + "\n"
+            )
+            
+            warnings = [line for line in result.stderr.splitlines() if "already exists" not in line]
+            if warnings:
+                self.log(f"Command warning: {'; '.join(warnings)}", "WARNING")
                     
             self.log("Proxmox CSI user setup completed", "SUCCESS")
             self.log("Update .proxmox-csi.env with the new token!", "WARNING")
@@ -397,34 +906,37 @@ PROXMOX_INSECURE="true"
         self.log("Labeling nodes with topology information...")
         
         try:
-            result = self.run_command(['kubectl', 'get', 'nodes', '-o', 'json'],
-                                     "Get nodes", check=True)
+            nodes = self.cached("nodes", 300, lambda: self.get_resources('Node', description="Get nodes"))
+            if nodes is None:
+                raise RuntimeError("could not list cluster nodes")
+            
+            # Zone comes from the control/worker node number suffix, anything else lands in node1
+            zones = {
+                name: f"node{name.rsplit('-', 1)[-1]}" if 'control' in name or 'worker' in name else "node1"
+                for name in (node['metadata']['name'] for node in nodes)
+            }
+            region = self.proxmox_config['PROXMOX_REGION']
+            wanted = {
+                name: {"topology.kubernetes.io/region": region, "topology.kubernetes.io/zone": zone}
+                for name, zone in zones.items()
+            }
             
-            nodes = json.loads(result.stdout)
+            # Skip nodes that already carry both labels (every rerun after the first)
+            current = {node['metadata']['name']: node['metadata'].get('labels') or {} for node in nodes}
+            to_label = {
+                name: labels for name, labels in wanted.items()
+                if any(current[name].get(key) != value for key, value in labels.items())
+            }
             
-            for node in nodes['items']:
-                node_name = node['metadata']['name']
-                
-                # Extract zone from node name
-                if 'control' in node_name:
-                    zone_num = node_name.split('-')[-1]
-                    zone = f"node{zone_num}"
-                elif 'worker' in node_name:
-                    zone_num = node_name.split('-')[-1]
-                    zone = f"node{zone_num}"
-                else:
-                    zone = "node1"
-                
-                labels = [
-                    f"topology.kubernetes.io/region={self.proxmox_config['PROXMOX_REGION']}",
-                    f"topology.kubernetes.io/zone={zone}"
-                ]
-                
-                for label in labels:
-                    self.run_command(
-                        ['kubectl', 'label', 'nodes', node_name, label, '--overwrite'],
-                        f"Label {node_name}", check=False
-                    )
+            def label_node(node_name, labels):
+                # Both labels in a single merge patch per node
+                return self.patch_resource('Node', node_name, {"metadata": {"labels": labels}},
+                                           description=f"Label {node_name}")
+            
+            # Nodes are independent, so label them all concurrently
+            if to_label:
+                with ThreadPoolExecutor(max_workers=len(to_label)) as executor:
+                    list(executor.map(label_node, to_label.keys(), to_label.values()))
                     
             self.log("Node labeling completed", "SUCCESS")
             return True
@@ -433,13 +945,38 @@ PROXMOX_INSECURE="true"
             self.log(f"Failed to label nodes: {str(e)}", "ERROR")
             return False
 
+    def check_csi_deployed(self):
+        """Check if Proxmox CSI is already deployed and healthy"""
+        try:
+            daemonsets = self.get_resources('DaemonSet', 'apps/v1', namespace='csi-proxmox',
+                                            description="Check CSI node plugin")
+            if daemonsets is None:
+                return False
+            
+            csi_ready = bool(daemonsets) and all(
+                ds.get('status', {}).get('desiredNumberScheduled', 0) > 0 and
+                ds['status'].get('numberReady', 0) == ds['status']['desiredNumberScheduled']
+                for ds in daemonsets
+            )
+            
+            return csi_ready and self.storage_class_available()
+            
+        except Exception:
+            return False
+
     def deploy_proxmox_csi(self):
         """Deploy Proxmox CSI driver using official manifest"""
         self.start_phase_timer("Proxmox CSI Deployment")
         
         try:
-            # Load and validate configuration
-            if not self.load_proxmox_config():
+            # Check if CSI is already deployed
+            if self.check_csi_deployed():
+                self.log("Proxmox CSI already deployed and healthy", "SUCCESS")
+                return True
+                
+            # Load and validate configuration (usually already done in the background by deploy())
+            proxmox_status = self.proxmox_check.result() if self.proxmox_check else self.check_proxmox_config()
+            if proxmox_status == "missing":
                 self.log("Proxmox CSI configuration not found", "WARNING")
                 self.log("Skipping CSI deployment - storage will not be available", "WARNING")
                 self.log("To enable storage, create configs/proxmox-csi-config.env with:", "INFO")
@@ -450,30 +987,27 @@ PROXMOX_INSECURE="true"
                 self.log("  PROXMOX_REGION=your-region", "INFO")
                 return True  # Return True to continue with other deployments
                 
-            if not self.validate_proxmox_config():
+            if proxmox_status == "invalid":
                 self.log("Invalid Proxmox CSI configuration", "WARNING")
                 self.log("Skipping CSI deployment - storage will not be available", "WARNING")
                 return True  # Return True to continue with other deployments
                 
-            if not self.test_proxmox_connection():
+            if proxmox_status == "unreachable":
                 self.log("Proxmox connection failed. Check credentials.", "WARNING")
                 self.log("Continuing with CSI deployment anyway...", "INFO")
             
             # Download official deployment
             self.log("Downloading official Proxmox CSI deployment...")
-            result = self.run_command(
-                'curl -s https://raw.githubusercontent.com/sergelogvinov/proxmox-csi-plugin/main/docs/deploy/proxmox-csi-plugin.yml',
-                "Download CSI manifest"
+            manifest = self.fetch_manifest(
+                'https://raw.githubusercontent.com/sergelogvinov/proxmox-csi-plugin/main/docs/deploy/proxmox-csi-plugin.yml'
             )
             
-            if result.returncode != 0:
+            if manifest is None:
                 self.log("Failed to download CSI manifest", "ERROR")
                 return False
             
-            # Parse and modify YAML
-            docs = list(yaml.safe_load_all(result.stdout))
-            
             # Create CSI config secret
+            insecure = self.proxmox_config.get('PROXMOX_INSECURE', 'false').lower() == 'true'
             csi_secret = {
                 'apiVersion': 'v1',
                 'kind': 'Secret',
@@ -483,55 +1017,53 @@ PROXMOX_INSECURE="true"
                 },
                 'type': 'Opaque',
                 'stringData': {
-                    'config.yaml': yaml.dump({
-                        'clusters': [{
-                            'url': self.proxmox_config['PROXMOX_URL'],
-                            'insecure': self.proxmox_config.get('PROXMOX_INSECURE', 'false').lower() == 'true',
-                            'token_id': self.proxmox_config['PROXMOX_TOKEN_ID'],
-                            'token_secret': self.proxmox_config['PROXMOX_TOKEN_SECRET'],
-                            'region': self.proxmox_config['PROXMOX_REGION']
-                        }]
-                    }, default_flow_style=False)
+                    # Fixed five-key record, so format it directly; json.dumps gives
+                    # double-quoted strings that are valid, fully escaped YAML scalars
+                    'config.yaml': (
+                        "clusters:\n"
+                        f"- url: {json.dumps(self.proxmox_config['PROXMOX_URL'])}\n"
+                        f"  insecure: {str(insecure).lower()}\n"
+                        f"  token_id: {json.dumps(self.proxmox_config['PROXMOX_TOKEN_ID'])}\n"
+                        f"  token_secret: {json.dumps(self.proxmox_config['PROXMOX_TOKEN_SECRET'])}\n"
+                        f"  region: {json.dumps(self.proxmox_config['PROXMOX_REGION'])}\n"
+                    )
                 }
             }
             
-            # Modify storage classes and build final manifest
-            final_docs = []
-            storage_class_added = False
-            
-            for doc in docs:
-                if not doc:
-                    continue
-                    
-                # Add secret after namespace
-                if doc.get('kind') == 'Namespace':
-                    final_docs.append(doc)
-                    final_docs.append(csi_secret)
-                    
-                # Replace storage classes with our RBD configuration
-                elif doc.get('kind') == 'StorageClass':
-                    if not storage_class_added:
-                        doc['metadata']['name'] = 'proxmox-rbd'
-                        doc['metadata']['annotations'] = {
-                            'storageclass.kubernetes.io/is-default-class': 'true'
-                        }
-                        doc['parameters'] = {
-                            'csi.storage.k8s.io/fstype': 'ext4',
-                            'storage': self.proxmox_config['PROXMOX_STORAGE']
-                        }
-                        final_docs.append(doc)
-                        storage_class_added = True
-                        self.log(f"Configured storage class for RBD: {self.proxmox_config['PROXMOX_STORAGE']}", "SUCCESS")
-                else:
-                    final_docs.append(doc)
-            
-            # Apply the manifest
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as f:
-                yaml.dump_all(final_docs, f, default_flow_style=False)
-                temp_file = f.name
+            # Modify storage classes while streaming documents from the parser to the dumper,
+            # so the manifest is never held as a full list of parsed documents
+            def final_docs():
+                storage_class_added = False
+                for doc in yaml.load_all(manifest, Loader=YAML_LOADER):
+                    if not doc:
+                        continue
+                        
+                    # Add secret after namespace
+                    if doc.get('kind') == 'Namespace':
+                        yield doc
+                        yield csi_secret
+                        
+                    # Replace storage classes with our RBD configuration
+                    elif doc.get('kind') == 'StorageClass':
+                        if not storage_class_added:
+                            doc['metadata']['name'] = 'proxmox-rbd'
+                            doc['metadata']['annotations'] = {
+                                'storageclass.kubernetes.io/is-default-class': 'true'
+                            }
+                            doc['parameters'] = {
+                                'csi.storage.k8s.io/fstype': 'ext4',
+                                'storage': self.proxmox_config['PROXMOX_STORAGE']
+                            }
+                            yield doc
+                            storage_class_added = True
+                            self.log(f"Configured storage class for RBD: {self.proxmox_config['PROXMOX_STORAGE']}", "SUCCESS")
+                    else:
+                        yield doc
             
+            # Apply the manifest straight from memory over stdin
             self.log("Applying Proxmox CSI deployment...")
-            result = self.run_command(f'kubectl apply -f {temp_file}', "Apply CSI manifest")
+            result = self.run_command(['kubectl', 'apply', '-f', '-'], "Apply CSI manifest",
+                                      input=yaml.dump_all(final_docs(), Dumper=YAML_DUMPER, default_flow_style=False), capture=False)
             
             if result.returncode == 0:
                 self.log("CSI deployment applied successfully", "SUCCESS")
@@ -539,26 +1071,24 @@ PROXMOX_INSECURE="true"
                 # Label nodes for topology
                 self.label_nodes_for_csi()
                 
-                # Wait for CSI pods to be ready
+                # Wait for the node plugin on every node and the controller, watching both at once
                 self.log("Waiting for CSI pods to be ready...")
-                time.sleep(10)
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    node_plugin = executor.submit(
+                        self.watch_until_ready, 'DaemonSet', 'apps/v1', ['proxmox-csi-plugin-node'],
+                        lambda ds: 0 < ds.get('status', {}).get('desiredNumberScheduled', 0) == ds['status'].get('numberReady', 0),
+                        namespace='csi-proxmox', timeout=120)
+                    controller = executor.submit(self.wait_for_deployment, 'proxmox-csi-plugin-controller', 'csi-proxmox', 120)
+                    csi_ready = node_plugin.result() and controller.result()
                 
-                result = self.run_command(
-                    "kubectl get pods -n csi-proxmox --no-headers | grep -v Running | wc -l",
-                    "Check CSI pod status"
-                )
-                
-                non_running = int(result.stdout.strip())
-                if non_running == 0:
+                if csi_ready:
                     self.log("All CSI pods are running", "SUCCESS")
                 else:
-                    self.log(f"{non_running} CSI pods still starting", "WARNING")
+                    self.log("CSI pods still starting", "WARNING")
             else:
                 self.log("Failed to apply CSI deployment", "ERROR")
                 return False
             
-            # Clean up temp file
-            Path(temp_file).unlink()
             return True
             
         except Exception as e:
@@ -570,28 +1100,32 @@ PROXMOX_INSECURE="true"
     # ================== Ingress Infrastructure ==================
 
     def check_ingress_deployed(self):
-        """Check if ingress stack is already deployed and healthy"""
+        """Check if ingress stack is already deployed and healthy (cached for 30s once it is)"""
+        return self.cached("ingress-stack", 30, self.probe_ingress_stack)
+
+    def probe_ingress_stack(self):
+        """Look for the MetalLB controller, NGINX Ingress and MetalLB IP pool in a single query"""
         try:
-            # Check if MetalLB controller is running
-            result = self.run_command("kubectl get deployment -n metallb-system metallb-controller --no-headers 2>/dev/null | wc -l",
-                                     "Check MetalLB controller", check=False)
-            if result.returncode != 0:
-                return False
-            metallb_deployed = int(result.stdout.strip()) > 0
-            
-            # Check if NGINX Ingress is running
-            result = self.run_command("kubectl get deployment -n ingress-nginx -l app.kubernetes.io/name=ingress-nginx --no-headers 2>/dev/null | wc -l",
-                                     "Check NGINX Ingress", check=False)
+            # Matched locally from a kind/namespace/name/app-label projection rather than whole objects;
+            # fails if the IPAddressPool CRD isn't installed yet, which means not deployed
+            result = self.run_command(
+                ['kubectl', 'get', 'deployments,ipaddresspools.metallb.io', '-A', '-o',
+                 'jsonpath={range .items[*]}{.kind}{"\\t"}{.metadata.namespace}{"\\t"}{.metadata.name}{"\\t"}{.metadata.labels.app\\.kubernetes\\.io/name}{"\\n"}{end}'],
+                "Check ingress stack",
+                check=False
+            )
             if result.returncode != 0:
                 return False
-            nginx_deployed = int(result.stdout.strip()) > 0
             
-            # Check if MetalLB IP pool is configured
-            result = self.run_command("kubectl get ipaddresspool -n metallb-system apps-pool --no-headers 2>/dev/null | wc -l",
-                                     "Check MetalLB IP pool", check=False)
-            if result.returncode != 0:
-                return False
-            ip_pool_configured = int(result.stdout.strip()) > 0
+            metallb_deployed = nginx_deployed = ip_pool_configured = False
+            for line in result.stdout.splitlines():
+                kind, namespace, name, app_label = line.split('\t')
+                if kind == 'IPAddressPool':
+                    ip_pool_configured |= (namespace, name) == ('metallb-system', 'apps-pool')
+                elif namespace == 'metallb-system':
+                    metallb_deployed |= name == 'metallb-controller'
+                elif namespace == 'ingress-nginx':
+                    nginx_deployed |= app_label == 'ingress-nginx'
             
             return metallb_deployed and nginx_deployed and ip_pool_configured
             
@@ -611,107 +1145,37 @@ PROXMOX_INSECURE="true"
             self.log("Deploying ingress infrastructure...")
             
             # Deploy MetalLB and NGINX Ingress via ArgoCD
-            ingress_stack_path = self.applications_dir / "ingress" / "complete-ingress-stack.yml"
-            if ingress_stack_path.exists():
+            ingress_stack_path = self.manifest_index.get("ingress/complete-ingress-stack.yml")
+            if ingress_stack_path:
                 self.log("Deploying MetalLB and NGINX Ingress Controller...")
-                self.run_command(f"kubectl apply -f {ingress_stack_path}",
-                               "Deploy ingress stack")
+                self.run_command(['kubectl', 'apply', '-f', str(ingress_stack_path)],
+                               "Deploy ingress stack", capture=False)
                 
-                # Wait for MetalLB to be ready
+                # Wait for MetalLB to be ready - the controller also serves the webhook the IP pool apply needs
                 self.log("Waiting for MetalLB controller...")
-                self.run_command("kubectl wait --for=condition=available --timeout=300s deployment/metallb-controller -n metallb-system || true",
-                               "Wait for MetalLB controller")
+                if not self.wait_for_deployment('metallb-controller', 'metallb-system'):
+                    self.log("MetalLB controller not available yet, continuing", "WARNING")
                 
                 # Wait for NGINX Ingress to be ready
                 self.log("Waiting for NGINX Ingress Controller...")
-                self.run_command("kubectl wait --for=condition=available --timeout=300s deployment/nginx-ingress-controller-ingress-nginx-controller -n ingress-nginx || true",
-                               "Wait for NGINX Ingress")
+                if not self.wait_for_deployment('nginx-ingress-controller-ingress-nginx-controller', 'ingress-nginx'):
+                    self.log("NGINX Ingress Controller not available yet, continuing", "WARNING")
                 
                 # Wait for MetalLB CRDs to be established before applying IP pool
                 self.log("Waiting for MetalLB CRDs to be ready...")
-                self.run_command("kubectl wait --for=condition=established --timeout=120s crd/ipaddresspools.metallb.io || true",
-                               "Wait for IPAddressPool CRD")
-                self.run_command("kubectl wait --for=condition=established --timeout=120s crd/l2advertisements.metallb.io || true",
-                               "Wait for L2Advertisement CRD")
-                
-                # Wait for MetalLB webhook to be ready
-                self.log("Waiting for MetalLB webhook to be operational...")
-                max_retries = 30
-                for i in range(max_retries):
-                    try:
-                        # Test if webhook is ready by doing a dry-run
-                        test_manifest = """
-apiVersion: metallb.io/v1beta1
-kind: IPAddressPool
-metadata:
-  name: test-pool
-  namespace: metallb-system
-spec:
-  addresses:
-  - 192.168.1.1-192.168.1.1
-"""
-                        with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as f:
-                            f.write(test_manifest)
-                            test_file = f.name
-                        
-                        result = subprocess.run(
-                            f"kubectl apply --dry-run=server -f {test_file}",
-                            shell=True,
-                            capture_output=True,
-                            text=True
-                        )
-                        os.unlink(test_file)
-                        
-                        if result.returncode == 0:
-                            self.log("MetalLB webhook is ready")
-                            break
-                    except Exception:
-                        pass
-                    
-                    if i < max_retries - 1:
-                        time.sleep(2)
-                    else:
-                        self.log("MetalLB webhook may not be fully ready, continuing anyway", "WARNING")
-                
-                # Apply MetalLB IP pool configuration
-                ip_pool_path = self.applications_dir / "ingress" / "metallb-ip-pool.yml"
-                if ip_pool_path.exists():
-                    self.log("Configuring MetalLB IP address pool...")
-                    self.run_command(f"kubectl apply -f {ip_pool_path}",
-                                   "Configure MetalLB IP pool")
-                
-                # Sync ArgoCD applications to ensure ingress components are deployed
-                self.sync_argocd_applications()
-                
-                # Update DNS configuration for ingress wildcard
-                self.log("Updating DNS configuration for ingress...")
-                self.deploy_dns_configuration()
-                
-        except Exception as e:
-            self.log(f"Ingress stack deployment failed: {str(e)}", "ERROR")
-            raise
-        finally:
-            self.end_phase_timer("Ingress Infrastructure")
-    
-    def configure_argocd_insecure(self):
-        """Configure ArgoCD for HTTP ingress access"""
-        self.log("Configuring ArgoCD for HTTP ingress...")
-        
-        try:
-            # Apply ArgoCD insecure configuration
-            argocd_config_path = self.applications_dir / "config" / "argocd-insecure-config.yml"
-            if argocd_config_path.exists():
-                self.run_command(f"kubectl apply -f {argocd_config_path}",
-                               "Configure ArgoCD insecure mode")
+                if not self.watch_until_ready("CustomResourceDefinition", "apiextensions.k8s.io/v1",
+                                              ['ipaddresspools.metallb.io', 'l2advertisements.metallb.io'],
+                                              lambda crd: self.has_condition(crd, 'Established'), timeout=120):
+                    self.log("MetalLB CRDs not established yet, continuing", "WARNING")
                 
                 # Restart ArgoCD server to pick up new configuration
                 self.log("Restarting ArgoCD server for configuration changes...")
-                self.run_command("kubectl rollout restart deployment/argocd-server -n argocd",
-                               "Restart ArgoCD server")
+                self.run_command(['kubectl', 'rollout', 'restart', 'deployment/argocd-server', '-n', 'argocd'],
+                               "Restart ArgoCD server", capture=False)
                 
                 # Wait for ArgoCD server to be ready
-                self.run_command("kubectl wait --for=condition=available --timeout=300s deployment/argocd-server -n argocd",
-                               "Wait for ArgoCD server restart")
+                if not self.wait_for_deployment('argocd-server', 'argocd'):
+                    raise RuntimeError("ArgoCD server did not become available after restart")
                 
         except Exception as e:
             self.log(f"ArgoCD configuration failed: {str(e)}", "WARNING")
@@ -721,33 +1185,33 @@ spec:
         self.log("Deploying application ingress resources...")
         
         try:
-            ingress_path = self.applications_dir / "ingress" / "application-ingresses.yml"
-            if ingress_path.exists():
-                self.run_command(f"kubectl apply -f {ingress_path}",
-                               "Deploy application ingresses")
+            ingress_path = self.manifest_index.get("ingress/application-ingresses.yml")
+            if ingress_path:
+                self.run_command(['kubectl', 'apply', '-f', str(ingress_path)],
+                               "Deploy application ingresses", capture=False)
+                self.invalidate("ingresses")
                 
                 # Verify ingress resources are created and working
                 self.log("Verifying ingress resources...")
-                result = self.run_command("kubectl get ingress --all-namespaces --no-headers | wc -l",
-                                         "Count ingress resources")
-                ingress_count = int(result.stdout.strip())
+                ingress_count = self.ingress_count()
                 if ingress_count > 0:
                     self.log(f"Created {ingress_count} ingress resources", "SUCCESS")
                     
-                    # Wait a moment for ingress to be ready
-                    time.sleep(10)
+                    # Test ArgoCD ingress connectivity as soon as the ingress starts routing
+                    def argocd_reachable():
+                        try:
+                            return self.http.get(f"{ARGOCD_URL}/", timeout=1).status_code == 200
+                        except requests.RequestException:
+                            return False
                     
-                    # Test ArgoCD ingress connectivity
-                    test_result = self.run_command(
-                        "curl -s -o /dev/null -w '%{http_code}' http://argocd.apps.sddc.info --connect-timeout 10",
-                        "Test ArgoCD ingress connectivity",
-                        check=False
-                    )
-                    if test_result.returncode == 0 and test_result.stdout.strip() == "200":
+                    self.log("Testing ArgoCD ingress connectivity...")
+                    if self.wait_until(argocd_reachable, timeout=60, interval=0.5):
                         self.log("ArgoCD ingress connectivity verified", "SUCCESS")
                         
-                        # Now that ingress is working, update ArgoCD password
-                        self.update_argocd_password()
+                        # Now that ingress is working, update ArgoCD password through its API
+                        # (without bcrypt; otherwise it was already set in the secret by deploy())
+                        if bcrypt is None:
+                            self.update_argocd_password()
                     else:
                         self.log("ArgoCD ingress connectivity test failed - may need time to propagate", "WARNING")
                 else:
@@ -762,7 +1226,7 @@ spec:
         
         try:
             if self.dns_config_script.exists():
-                self.run_command(f"python3 {self.dns_config_script}",
+                self.run_command(['python3', str(self.dns_config_script)],
                                "Update DNS configuration")
                 self.log("DNS configuration updated successfully", "SUCCESS")
             else:
@@ -780,33 +1244,27 @@ spec:
         try:
             self.log("Deploying monitoring stack (Prometheus + Grafana)...")
             
-            for component in self.monitoring_components:
-                component_path = self.applications_dir / component
-                if not component_path.exists():
-                    self.log(f"Component not found: {component}", "ERROR")
-                    continue
-                    
-                self.log(f"Applying {component}...")
-                self.run_command(f"kubectl apply -f {component_path}",
-                               f"Deploy {component}")
+            for component in self.missing_monitoring_components:
+                self.log(f"Component not found: {component}", "ERROR")
                 
-                # Add delay between components for proper initialization
-                time.sleep(5)
-            
-            # Wait for monitoring namespace to be ready
-            self.log("Waiting for monitoring namespace...")
-            self.run_command("kubectl wait --for=condition=available --timeout=600s deployment/kube-prometheus-stack-operator -n monitoring || true",
-                           "Wait for Prometheus Operator")
-            
-            # Wait for Grafana to be ready  
-            self.log("Waiting for Grafana deployment...")
-            self.run_command("kubectl wait --for=condition=available --timeout=600s deployment/kube-prometheus-stack-grafana -n monitoring || true",
-                           "Wait for Grafana")
-                           
-            # Wait for Prometheus to be ready
-            self.log("Waiting for Prometheus StatefulSet...")
-            self.run_command("kubectl wait --for=condition=ready --timeout=600s pod -l app.kubernetes.io/name=prometheus -n monitoring || true",
-                           "Wait for Prometheus pods")
+            self.log(f"Applying {', '.join(path.name for path in self.monitoring_component_paths)}...")
+            self.apply_manifests(self.monitoring_component_paths, "Deploy monitoring components")
+            
+            # The operator, Grafana and Prometheus become ready independently - wait on all three at once
+            self.log("Waiting for Prometheus Operator, Grafana deployment and Prometheus StatefulSet...")
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                waits = [
+                    executor.submit(self.wait_for_deployment, 'kube-prometheus-stack-operator', 'monitoring', 600),
+                    executor.submit(self.wait_for_deployment, 'kube-prometheus-stack-grafana', 'monitoring', 600),
+                    executor.submit(self.run_command,
+                                    ['kubectl', 'wait', '--for=condition=ready', '--timeout=600s', 'pod', '-l', 'app.kubernetes.io/name=prometheus', '-n', 'monitoring'],
+                                    "Wait for Prometheus pods", check=False, capture=False)
+                ]
+                operator_ready, grafana_ready = waits[0].result(), waits[1].result()
+            if not operator_ready:
+                self.log("Prometheus Operator not available yet", "WARNING")
+            if not grafana_ready:
+                self.log("Grafana not available yet", "WARNING")
             
         except Exception as e:
             self.log(f"Monitoring stack deployment failed: {str(e)}", "ERROR") 
@@ -826,69 +1284,63 @@ spec:
             # Create monitoring values with consistent password
             values_content = self.create_monitoring_helm_values()
             
-            # Write values to temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-                f.write(values_content)
-                values_file = f.name
-            
-            try:
+            def refresh_helm_repo():
                 # Add Prometheus Helm repo
                 self.run_command(
-                    'helm repo add prometheus-community https://prometheus-community.github.io/helm-charts',
+                    ['helm', 'repo', 'add', 'prometheus-community', 'https://prometheus-community.github.io/helm-charts'],
                     'Add Prometheus Helm repository',
                     check=False
                 )
-                
-                self.run_command('helm repo update', 'Update Helm repositories')
+                self.run_command(['helm', 'repo', 'update'], 'Update Helm repositories')
+            
+            # The repo refresh only talks to the chart repository, so it overlaps the cluster cleanup
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                repo_refresh = executor.submit(refresh_helm_repo)
                 
                 # Clean up any existing ArgoCD application and problematic resources
                 self.cleanup_existing_monitoring()
                 
                 # Ensure clean state for Helm deployment
                 self.run_command(
-                    'kubectl delete application kube-prometheus-stack -n argocd',
+                    ['kubectl', 'delete', 'application', 'kube-prometheus-stack', '-n', 'argocd'],
                     'Remove ArgoCD application',
                     check=False
                 )
-                
-                # Check if release already exists
-                result = self.run_command(
-                    'helm list -n monitoring -o json',
-                    'Check existing Helm releases',
-                    check=False
-                )
-                
-                existing_releases = json.loads(result.stdout) if result.returncode == 0 and result.stdout else []
-                release_exists = any(r['name'] == 'kube-prometheus-stack' for r in existing_releases)
-                
-                if release_exists:
-                    self.log("Upgrading existing monitoring stack...")
-                    cmd = f'helm upgrade kube-prometheus-stack prometheus-community/kube-prometheus-stack --namespace monitoring --values {values_file}'
-                else:
-                    self.log("Installing monitoring stack...")
-                    cmd = f'helm install kube-prometheus-stack prometheus-community/kube-prometheus-stack --namespace monitoring --create-namespace --values {values_file}'
-                
-                result = self.run_command(cmd, 'Deploy monitoring stack')
-                
-                if result.returncode == 0:
-                    self.log("Monitoring stack deployed successfully", "SUCCESS")
-                    
-                    # Wait for pods to be ready
-                    self.log("Waiting for monitoring pods to be ready...")
-                    time.sleep(30)
-                    self.run_command(
-                        "kubectl wait --for=condition=ready --timeout=300s pod -l app.kubernetes.io/name=grafana -n monitoring",
-                        "Wait for Grafana",
-                        check=False
-                    )
-                    return True
-                else:
-                    self.log(f"Monitoring deployment failed: {result.stderr}", "ERROR")
-                    return False
-                    
-            finally:
-                # Clean up temp file
-                Path(values_file).unlink(missing_ok=True)
+                repo_refresh.result()
+            
+            # Check if release already exists
+            release_exists = self.run_command(
+                ['helm', 'status', 'kube-prometheus-stack', '-n', 'monitoring'],
+                'Check existing Helm release',
+                check=False,
+                capture=False
+            ).returncode == 0
+            
+            if release_exists:
+                self.log("Upgrading existing monitoring stack...")
+                cmd = ['helm', 'upgrade', 'kube-prometheus-stack', 'prometheus-community/kube-prometheus-stack',
+                       '--namespace', 'monitoring', '--values', '-']
+            else:
+                self.log("Installing monitoring stack...")
+                cmd = ['helm', 'install', 'kube-prometheus-stack', 'prometheus-community/kube-prometheus-stack',
+                       '--namespace', 'monitoring', '--create-namespace', '--values', '-']
+            
+            # Let helm watch the release's resources until they are ready
+            cmd += ['--wait', '--timeout', '10m']
+            if self.verbose:
+                cmd.append('--debug')
+            
+            self.log("Waiting for monitoring pods to be ready...")
+            # Values are piped over stdin so nothing is left on disk
+            result = self.run_command(cmd, 'Deploy monitoring stack', timeout=660,
+                                      input=values_content, capture=not self.verbose)
+            
+            if result.returncode == 0:
+                self.log("Monitoring stack deployed successfully", "SUCCESS")
+                return True
+            else:
+                self.log(f"Monitoring deployment failed: {result.stderr}", "ERROR")
+                return False
                 
         except Exception as e:
             self.log(f"Failed to deploy monitoring stack: {str(e)}", "ERROR")
@@ -899,16 +1351,15 @@ spec:
     def ensure_helm_available(self):
         """Ensure Helm is installed and available"""
         try:
-            result = self.run_command('helm version', 'Check Helm version', check=False)
+            result = self.run_command(['helm', 'version'], 'Check Helm version', check=False)
             if result.returncode == 0:
                 return True
             
             # Install Helm if not available
             self.log("Installing Helm...")
-            self.run_command(
-                'curl -fsSL https://raw.githubusercontent.com/helm/helm/main/scripts/get-helm-3 | bash',
-                'Install Helm'
-            )
+            response = self.http.get('https://raw.githubusercontent.com/helm/helm/main/scripts/get-helm-3', timeout=30)
+            response.raise_for_status()
+            self.run_command(['bash'], 'Install Helm', input=response.text)
             return True
             
         except Exception as e:
@@ -920,14 +1371,9 @@ spec:
         try:
             # Clean up webhook configurations that might conflict
             self.run_command(
-                'kubectl delete mutatingwebhookconfiguration kube-prometheus-stack-admission',
-                'Clean up mutating webhook',
-                check=False
-            )
-            
-            self.run_command(
-                'kubectl delete validatingwebhookconfiguration kube-prometheus-stack-admission',
-                'Clean up validating webhook',
+                ['kubectl', 'delete', 'mutatingwebhookconfiguration,validatingwebhookconfiguration',
+                 'kube-prometheus-stack-admission', '--ignore-not-found'],
+                'Clean up admission webhooks',
                 check=False
             )
             
@@ -941,12 +1387,11 @@ spec:
                 'kube-prometheus-stack-kubelet'
             ]
             
-            for service in services_to_clean:
-                self.run_command(
-                    f'kubectl delete service {service} -n kube-system',
-                    f'Clean up {service}',
-                    check=False
-                )
+            self.run_command(
+                ['kubectl', 'delete', 'service', '-n', 'kube-system', '--ignore-not-found'] + services_to_clean,
+                'Clean up leftover kube-system services',
+                check=False
+            )
                 
         except Exception as e:
             self.log(f"Warning during cleanup: {str(e)}", "WARNING")
@@ -954,115 +1399,31 @@ spec:
     def create_monitoring_helm_values(self):
         """Create Helm values with proper storage and consistent passwords"""
         
-        # Check if storage class is available
-        result = self.run_command(
-            "kubectl get storageclass proxmox-rbd 2>/dev/null",
-            "Check storage class",
-            check=False
-        )
-        storage_available = result.returncode == 0
+        values = copy.deepcopy(MONITORING_VALUES_BASE)
+        values['grafana']['adminPassword'] = self.standard_password
         
-        if not storage_available:
+        if self.storage_class_available():
+            def volume_claim(size):
+                return {'volumeClaimTemplate': {'spec': {
+                    'storageClassName': 'proxmox-rbd',
+                    'accessModes': ['ReadWriteOnce'],
+                    'resources': {'requests': {'storage': size}}
+                }}}
+            
+            values['prometheus']['prometheusSpec']['storageSpec'] = volume_claim('50Gi')
+            values['alertmanager']['alertmanagerSpec']['storage'] = volume_claim('5Gi')
+            values['grafana']['persistence'] = {
+                'enabled': True,
+                'storageClassName': 'proxmox-rbd',
+                'size': '10Gi',
+                'accessModes': ['ReadWriteOnce']
+            }
+        else:
             self.log("Storage class 'proxmox-rbd' not available - using ephemeral storage", "WARNING")
             self.log("Data will be lost if pods restart. Configure CSI for persistent storage.", "WARNING")
-            
-            # Return values without persistent storage
-            return f"""# Monitoring stack values without persistent storage
-prometheus:
-  prometheusSpec:
-    retention: 15d
-    resources:
-      requests:
-        cpu: 200m
-        memory: 1Gi
-      limits:
-        cpu: 1000m
-        memory: 2Gi
-
-grafana:
-  enabled: true
-  adminPassword: {self.standard_password}
-  persistence:
-    enabled: false  # No storage class available
-  service:
-    type: LoadBalancer
-    port: 80
-    annotations:
-      metallb.universe.tf/loadBalancerIPs: "10.10.1.50"
-  grafana.ini:
-    server:
-      domain: grafana.apps.sddc.info
-      root_url: http://grafana.apps.sddc.info/
-    users:
-      allow_sign_up: false
-
-alertmanager:
-  enabled: true
-  alertmanagerSpec:
-    service:
-      type: LoadBalancer
-      annotations:
-        metallb.universe.tf/loadBalancerIPs: "10.10.1.51"
-"""
         
-        # Return values with persistent storage
-        return f"""# Monitoring stack values with persistent storage
-prometheus:
-  prometheusSpec:
-    storageSpec:
-      volumeClaimTemplate:
-        spec:
-          storageClassName: proxmox-rbd
-          accessModes: ["ReadWriteOnce"]
-          resources:
-            requests:
-              storage: 50Gi
-    retention: 15d
-    resources:
-      requests:
-        cpu: 200m
-        memory: 1Gi
-      limits:
-        cpu: 1000m
-        memory: 2Gi
-
-grafana:
-  enabled: true
-  adminPassword: {self.standard_password}
-  persistence:
-    enabled: true
-    storageClassName: proxmox-rbd
-    size: 10Gi
-    accessModes:
-    - ReadWriteOnce
-  service:
-    type: LoadBalancer
-    port: 80
-    annotations:
-      metallb.universe.tf/loadBalancerIPs: "10.10.1.50"
-  grafana.ini:
-    server:
-      domain: grafana.apps.sddc.info
-      root_url: http://grafana.apps.sddc.info/
-    users:
-      allow_sign_up: false
-
-alertmanager:
-  enabled: true
-  alertmanagerSpec:
-    storage:
-      volumeClaimTemplate:
-        spec:
-          storageClassName: proxmox-rbd
-          accessModes: ["ReadWriteOnce"]
-          resources:
-            requests:
-              storage: 5Gi
-    service:
-      type: LoadBalancer
-      annotations:
-        metallb.universe.tf/loadBalancerIPs: "10.10.1.51"
-"""
+        # Dumping (rather than interpolating) keeps passwords with YAML-special characters intact
+        return yaml.dump(values, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False)
 
     # ================== Verification ==================
 
@@ -1073,56 +1434,103 @@ alertmanager:
         try:
             self.log("Verifying application deployments...")
             
-            # Check CSI driver
-            self.log("Checking Proxmox CSI driver...")
-            result = self.run_command("kubectl get pods -n csi-proxmox --no-headers 2>/dev/null | grep Running | wc -l",
-                                     "Check CSI pods")
-            if result.returncode == 0:
-                running_pods = int(result.stdout.strip())
-                if running_pods > 0:
-                    self.log(f"✓ Proxmox CSI: {running_pods} pods running", "SUCCESS")
-                else:
-                    self.log("✗ Proxmox CSI pods not running", "WARNING")
+            # Workload checks are answered from one listing per kind through the shared client; the few
+            # remaining independent reads run alongside them, then everything is reported in order
+            workload_kinds = {"Deployment": "apps/v1", "StatefulSet": "apps/v1", "Pod": "v1",
+                              "Ingress": "networking.k8s.io/v1"}
+            queries = {
+                **{kind: functools.partial(self.get_resources, kind, api_version, description=f"List {kind} for verification")
+                   for kind, api_version in workload_kinds.items()},
+                "storage_class": self.storage_class_available,
+                # Not reported here, but fetched alongside so print_access_information hits the cache
+                "storage_class_count": self.storage_class_count,
+                "ingress_ip": self.get_ingress_ip,
+                "argocd_insecure": lambda: self.run_command(['kubectl', 'get', 'configmap', 'argocd-cmd-params-cm', '-n', 'argocd',
+                                                             '-o', 'jsonpath={.data.server\\.insecure}'],
+                                                            "Check ArgoCD insecure config", check=False)
+            }
+            with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                futures = {name: executor.submit(query) for name, query in queries.items()}
+            results = {name: future.result() for name, future in futures.items()}
             
             # Check storage class
-            result = self.run_command("kubectl get storageclass proxmox-rbd --no-headers 2>/dev/null | wc -l",
-                                     "Check storage class")
-            if result.returncode == 0 and int(result.stdout.strip()) > 0:
+            if results["storage_class"]:
                 self.log("✓ Proxmox RBD storage class configured", "SUCCESS")
             else:
                 self.log("✗ Proxmox RBD storage class not found", "WARNING")
             
+            # Check ArgoCD ingress configuration
+            if results["argocd_insecure"].stdout.strip() == "true":
+                self.log("✓ ArgoCD configured for HTTP ingress", "SUCCESS")
+            else:
+                self.log("ArgoCD HTTP ingress configuration not found", "WARNING")
+            
+            # Without the listings every workload would be reported missing, so report the failure once instead
+            if any(results[kind] is None for kind in workload_kinds):
+                self.log("Could not list workloads, skipping workload checks", "WARNING")
+                return
+            
+            def count(kind, namespace=None, label=None, where=None):
+                label_key, _, label_value = label.partition('=') if label else (None, None, None)
+                return sum(
+                    1 for item in results[kind]
+                    if (namespace is None or item['metadata'].get('namespace') == namespace)
+                    and (label is None or (item['metadata'].get('labels') or {}).get(label_key) == label_value)
+                    and (where is None or where(item))
+                )
+            
+            def has_problem(pod):
+                # Same states the STATUS column reports for Error / CrashLoopBackOff / ImagePullBackOff
+                for status in pod.get('status', {}).get('containerStatuses') or []:
+                    state = status.get('state', {})
+                    reason = (state.get('waiting') or state.get('terminated') or {}).get('reason')
+                    if reason in ('Error', 'CrashLoopBackOff', 'ImagePullBackOff'):
+                        return True
+                return False
+            
+            results.update({
+                "csi_pods": count("Pod", "csi-proxmox", where=lambda pod: pod.get('status', {}).get('phase') == 'Running'),
+                "metallb": count("Deployment", "metallb-system", where=lambda d: d['metadata']['name'] == 'metallb-controller'),
+                "nginx": count("Deployment", "ingress-nginx", "app.kubernetes.io/name=ingress-nginx"),
+                "ingresses": count("Ingress"),
+                "problem_pods": count("Pod", where=has_problem),
+                "prometheus": count("StatefulSet", "monitoring", "app.kubernetes.io/name=prometheus"),
+                "grafana": count("Deployment", "monitoring", "app.kubernetes.io/name=grafana"),
+                "alertmanager": count("StatefulSet", "monitoring", "app.kubernetes.io/name=alertmanager")
+            })
+            
+            # Check CSI driver
+            self.log("Checking Proxmox CSI driver...")
+            running_pods = results["csi_pods"]
+            if running_pods > 0:
+                self.log(f"✓ Proxmox CSI: {running_pods} pods running", "SUCCESS")
+            else:
+                self.log("✗ Proxmox CSI pods not running", "WARNING")
+            
             # Check ingress infrastructure
             self.log("Checking ingress infrastructure...")
             
             # Check MetalLB
-            result = self.run_command("kubectl get deployment -n metallb-system metallb-controller --no-headers 2>/dev/null | wc -l",
-                                     "Check MetalLB controller")
-            if int(result.stdout.strip()) > 0:
+            if results["metallb"] > 0:
                 self.log("✓ MetalLB controller is deployed", "SUCCESS")
             else:
                 self.log("✗ MetalLB controller not found", "ERROR")
             
             # Check NGINX Ingress
-            result = self.run_command("kubectl get deployment -n ingress-nginx -l app.kubernetes.io/name=ingress-nginx --no-headers 2>/dev/null | wc -l",
-                                     "Check NGINX Ingress")
-            if int(result.stdout.strip()) > 0:
+            if results["nginx"] > 0:
                 self.log("✓ NGINX Ingress Controller is deployed", "SUCCESS")
                 
                 # Get ingress LoadBalancer IP
-                result = self.run_command("kubectl get svc -n ingress-nginx -o jsonpath='{.items[0].status.loadBalancer.ingress[0].ip}' 2>/dev/null || echo 'pending'",
-                                         "Get NGINX Ingress LoadBalancer IP")
-                if result.stdout.strip() != "pending":
-                    self.log(f"✓ NGINX Ingress available at: {result.stdout.strip()}", "SUCCESS")
+                ingress_ip = results["ingress_ip"]
+                if ingress_ip != "pending":
+                    self.log(f"✓ NGINX Ingress available at: {ingress_ip}", "SUCCESS")
                 else:
                     self.log("NGINX Ingress LoadBalancer IP pending...", "WARNING")
             else:
                 self.log("✗ NGINX Ingress Controller not found", "ERROR")
             
             # Check ingress resources
-            result = self.run_command("kubectl get ingress --all-namespaces --no-headers | wc -l",
-                                     "Count ingress resources")
-            ingress_count = int(result.stdout.strip())
+            ingress_count = results["ingresses"]
             if ingress_count > 0:
                 self.log(f"✓ {ingress_count} ingress resources configured", "SUCCESS")
             else:
@@ -1133,40 +1541,24 @@ alertmanager:
                 self.log("Checking monitoring stack...")
                 
                 # Check Prometheus
-                result = self.run_command("kubectl get statefulset -n monitoring -l app.kubernetes.io/name=prometheus --no-headers | wc -l",
-                                         "Check Prometheus StatefulSet")
-                if int(result.stdout.strip()) > 0:
+                if results["prometheus"] > 0:
                     self.log("✓ Prometheus is deployed", "SUCCESS")
                 else:
                     self.log("✗ Prometheus not found", "ERROR")
                 
                 # Check Grafana
-                result = self.run_command("kubectl get deployment -n monitoring -l app.kubernetes.io/name=grafana --no-headers | wc -l",
-                                         "Check Grafana deployment")
-                if int(result.stdout.strip()) > 0:
+                if results["grafana"] > 0:
                     self.log("✓ Grafana is deployed", "SUCCESS")
                 else:
                     self.log("✗ Grafana not found", "ERROR")
                 
                 # Check AlertManager
-                result = self.run_command("kubectl get statefulset -n monitoring -l app.kubernetes.io/name=alertmanager --no-headers | wc -l",
-                                         "Check AlertManager")
-                if int(result.stdout.strip()) > 0:
+                if results["alertmanager"] > 0:
                     self.log("✓ AlertManager is deployed", "SUCCESS")
                 
-            # Check ArgoCD ingress configuration
-            result = self.run_command("kubectl get configmap argocd-cmd-params-cm -n argocd -o jsonpath='{.data.server\\.insecure}' 2>/dev/null || echo 'not-found'",
-                                     "Check ArgoCD insecure config")
-            if result.stdout.strip() == "true":
-                self.log("✓ ArgoCD configured for HTTP ingress", "SUCCESS")
-            else:
-                self.log("ArgoCD HTTP ingress configuration not found", "WARNING")
-                
             # Overall health check
             self.log("Checking overall application health...")
-            result = self.run_command("kubectl get pods --all-namespaces | grep -E '(Error|CrashLoopBackOff|ImagePullBackOff)' | wc -l",
-                                     "Check for problematic pods")
-            problem_pods = int(result.stdout.strip())
+            problem_pods = results["problem_pods"]
             if problem_pods == 0:
                 self.log("✓ All application pods are healthy", "SUCCESS")
             else:
@@ -1186,9 +1578,7 @@ alertmanager:
         
         try:
             # Get ingress IP for applications
-            result = self.run_command("kubectl get svc -n ingress-nginx -o jsonpath='{.items[0].status.loadBalancer.ingress[0].ip}' 2>/dev/null || echo 'pending'",
-                                     "Get NGINX Ingress IP")
-            ingress_ip = result.stdout.strip()
+            ingress_ip = self.get_ingress_ip()
             
             if ingress_ip != "pending":
                 print(f"""
@@ -1228,8 +1618,7 @@ alertmanager:
                 
             # Storage information
             if not self.monitoring_only:
-                result = self.run_command("kubectl get storageclass --no-headers | wc -l", "Count storage classes")
-                sc_count = int(result.stdout.strip())
+                sc_count = self.storage_class_count()
                 
                 print(f"""
 ┌─ Storage Integration ──────────────────────────────────────────────┐
@@ -1285,27 +1674,45 @@ alertmanager:
             self.log("Starting Kubernetes Applications Deployment", "PHASE")
             self.log(f"Mode: {'Storage Only' if self.storage_only else 'Monitoring Only' if self.monitoring_only else 'Full Deployment'}")
             
+            # The Proxmox CSI config/API check is independent of the cluster work,
+            # so overlap it with the prerequisites (including a possible ArgoCD install)
+            if not self.monitoring_only:
+                executor = ThreadPoolExecutor(max_workers=1)
+                self.proxmox_check = executor.submit(self.check_proxmox_config)
+                executor.shutdown(wait=False)
+            
             # Prerequisites check
             if not self.skip_prerequisites:
                 self.check_prerequisites()
             
-            # Deploy ingress infrastructure first (required for application access)
-            self.deploy_ingress_stack()
-            
-            # Configure ArgoCD for HTTP ingress
-            self.configure_argocd_insecure()
-            
-            # Storage deployment (Proxmox CSI)
-            if not self.monitoring_only:
-                self.deploy_proxmox_csi()
-            
-            # Monitoring deployment  
-            if not self.storage_only:
-                # Use Helm-based deployment for better reliability
-                self.deploy_monitoring_helm()
+            # Storage (Proxmox CSI) only needs the cluster and the Proxmox API, so it runs alongside the
+            # ingress stack; application ingresses follow the ingress stack in the background too.
+            # Monitoring waits for storage (to pick its volumes) and for MetalLB (LoadBalancer IPs)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                storage = None if self.monitoring_only else executor.submit(self.deploy_proxmox_csi)
+                
+                # With bcrypt available the password goes straight into the secret, no ingress needed,
+                # so it is in place before the ingress stack's ArgoCD sync logs in with it
+                if bcrypt is not None:
+                    self.update_argocd_password()
+                
+                # Deploy ingress infrastructure first (required for application access)
+                self.deploy_ingress_stack()
+                
+                # Configure ArgoCD for HTTP ingress
+                self.configure_argocd_insecure()
+                
+                ingresses = executor.submit(self.deploy_application_ingresses)
+                
+                if storage is not None:
+                    storage.result()
                 
-            # Deploy application ingresses
-            self.deploy_application_ingresses()
+                # Monitoring deployment  
+                if not self.storage_only:
+                    # Use Helm-based deployment for better reliability
+                    self.deploy_monitoring_helm()
+                
+                ingresses.result()
             
             # Verification
             if not self.verify_only:
@@ -1323,83 +1730,193 @@ alertmanager:
             self.log(f"Deployment failed: {str(e)}", "ERROR")
             sys.exit(1)
 
+    def get_argocd_app_statuses(self):
+        """Map each ArgoCD application name to its (sync, health) status, or None if they can't be listed
+        
+        Only those fields are projected out with jsonpath, so the full Application objects are never transferred.
+        """
+        result = self.run_command(
+            ['kubectl', 'get', 'applications.argoproj.io', '-n', 'argocd', '--chunk-size=500', '-o',
+             'jsonpath={range .items[*]}{.metadata.name}{"\\t"}{.status.sync.status}{"\\t"}{.status.health.status}{"\\n"}{end}'],
+            "List ArgoCD application status",
+            check=False
+        )
+        if result.returncode != 0:
+            return None
+        
+        statuses = {}
+        for line in result.stdout.splitlines():
+            name, sync_status, health_status = line.split('\t')
+            statuses[name] = (sync_status or 'Unknown', health_status or 'Unknown')
+        return statuses
+
+    def argocd_api_token(self):
+        """Log in to the ArgoCD API through the ingress once per run; None if it isn't reachable"""
+        def login():
+            try:
+                # Quick probe outside the pooled session and its retries first: until the ArgoCD
+                # ingress exists, a login would sit out its full timeout on every retry
+                requests.head(f"{ARGOCD_URL}/", timeout=2)
+                response = self.http.post(f"{ARGOCD_URL}/api/v1/session",
+                                          json={"username": "admin", "password": self.standard_password}, timeout=10)
+                if response.status_code == 401:
+                    # The standard password is not set yet (no bcrypt here): use the generated one
+                    initial_password = self.argocd_initial_password()
+                    if initial_password:
+                        response = self.http.post(f"{ARGOCD_URL}/api/v1/session",
+                                                  json={"username": "admin", "password": initial_password}, timeout=10)
+                return response.json().get("token") if response.status_code == 200 else None
+            except (requests.RequestException, ValueError) as e:
+                self.log(f"ArgoCD API login failed: {str(e)}", "DEBUG")
+                return None
+        return self.cached("argocd-token", float("inf"), login)
+
+    def request_argocd_sync(self, app_name, token):
+        """Ask ArgoCD to sync one application without waiting for it; returns whether it was accepted"""
+        try:
+            response = self.http.post(f"{ARGOCD_URL}/api/v1/applications/{app_name}/sync",
+                                      json={"prune": True}, headers={"Authorization": f"Bearer {token}"}, timeout=30)
+        except requests.RequestException as e:
+            self.log(f"Sync {app_name} failed: {str(e)}", "DEBUG")
+            return False
+        return response.status_code == 200
+
+    @staticmethod
+    def app_status(app):
+        """Return an Application's (sync, health) status, 'Unknown' for anything not reported yet"""
+        status = app.get('status')
+        if not status:
+            return 'Unknown', 'Unknown'
+        sync, health = status.get('sync'), status.get('health')
+        return ((sync and sync.get('status')) or 'Unknown',
+                (health and health.get('status')) or 'Unknown')
+
+    def enable_auto_sync(self, app_names):
+        """Turn on automated sync for the given applications with one server-side apply"""
+        auto_sync = {
+            "apiVersion": "v1",
+            "kind": "List",
+            "items": [
+                {"apiVersion": "argoproj.io/v1alpha1", "kind": "Application",
+                 "metadata": {"name": name, "namespace": "argocd"}, "spec": AUTO_SYNC_SPEC}
+                for name in app_names
+            ]
+        }
+        self.run_command(
+            ['kubectl', 'apply', '--server-side', '--force-conflicts', '--field-manager=deploy-applications', '-f', '-'],
+            "Enable automated sync",
+            check=False,
+            input=json.dumps(auto_sync),
+            capture=False
+        )
+
+    def trigger_argocd_syncs(self, app_names, token):
+        """Request a sync for every application through the REST API, enabling automated sync where refused"""
+        # One request per application on the shared keep-alive session, issued concurrently
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            accepted = list(executor.map(lambda name: self.request_argocd_sync(name, token), app_names))
+        failed = [name for name, ok in zip(app_names, accepted) if not ok]
+        if failed:
+            self.enable_auto_sync(failed)
+
     def sync_argocd_applications(self):
         """Sync ArgoCD applications to ensure they are deployed"""
         try:
             self.log("Syncing ArgoCD applications...")
             
             # Get list of applications
-            result = self.run_command(
-                "kubectl get applications -n argocd -o json",
-                "List ArgoCD applications",
-                check=False
-            )
+            statuses = self.get_argocd_app_statuses()
             
-            if result.returncode != 0:
+            if statuses is None:
                 self.log("No ArgoCD applications found", "INFO")
                 return
             
-            import json
-            apps_data = json.loads(result.stdout)
+            def is_settled(status):
+                sync_status, health_status = status
+                return sync_status == 'Synced' and health_status in SETTLED_HEALTH
             
-            for app in apps_data.get('items', []):
-                app_name = app['metadata']['name']
-                sync_status = app.get('status', {}).get('sync', {}).get('status', 'Unknown')
-                
-                if sync_status != 'Synced':
-                    self.log(f"Syncing application: {app_name}")
-                    # Use argocd CLI to sync instead of patch
-                    self.run_command(
-                        f"argocd app sync {app_name} --server localhost:8080 --insecure --auth-token '' || kubectl patch application {app_name} -n argocd --type merge -p '{{\"spec\":{{\"syncPolicy\":{{\"automated\":{{\"prune\":true,\"selfHeal\":true}}}}}}}}'",
-                        f"Sync {app_name}",
-                        check=False
-                    )
-                    
-                    # Wait a moment for sync to initiate
-                    time.sleep(2)
+            def settled(statuses):
+                return all(map(is_settled, statuses.values()))
             
-            # Wait for applications to sync
-            self.log("Waiting for applications to sync...")
+            # Steady state: nothing to trigger and nothing to wait for
+            if settled(statuses):
+                self.log("All ArgoCD applications already synced", "SUCCESS")
+                return
+            
+            out_of_sync = [name for name, (sync_status, _) in statuses.items() if sync_status != 'Synced']
             max_wait = 180  # 3 minutes
-            start_time = time.time()
             
-            while time.time() - start_time < max_wait:
-                result = self.run_command(
-                    "kubectl get applications -n argocd -o json",
-                    "Check sync status",
-                    check=False
-                )
+            # Sync requests may run in the background while the watch below is already consuming events
+            background = ThreadPoolExecutor(max_workers=1)
+            try:
+                if out_of_sync:
+                    self.log(f"Syncing applications: {', '.join(out_of_sync)}")
+                    token = self.argocd_api_token()
+                    if token:
+                        background.submit(self.trigger_argocd_syncs, out_of_sync, token)
+                    else:
+                        # One argocd call triggers every sync without waiting on them
+                        result = self.run_command(
+                            ['argocd', 'app', 'sync', *out_of_sync, '--async'],
+                            "Sync out-of-sync applications",
+                            check=False,
+                            env=self.argocd_env
+                        )
+                        if result.returncode == 0:
+                            # The argocd server already watches its applications, so let it do the waiting
+                            self.log("Waiting for applications to sync...")
+                            result = self.run_command(
+                                ['argocd', 'app', 'wait', *statuses, '--sync', '--health', '--operation', '--timeout', str(max_wait)],
+                                "Wait for applications to sync",
+                                check=False,
+                                timeout=max_wait + 30,
+                                capture=False,
+                                env=self.argocd_env
+                            )
+                            if result.returncode == 0:
+                                self.log("All ArgoCD applications synced successfully", "SUCCESS")
+                            else:
+                                self.log("Timeout waiting for ArgoCD applications to sync", "WARNING")
+                            return
+                        self.enable_auto_sync(out_of_sync)
                 
-                if result.returncode == 0:
-                    apps_data = json.loads(result.stdout)
-                    all_synced = True
-                    
-                    for app in apps_data.get('items', []):
-                        app_name = app['metadata']['name']
-                        sync_status = app.get('status', {}).get('sync', {}).get('status', 'Unknown')
-                        health_status = app.get('status', {}).get('health', {}).get('status', 'Unknown')
-                        
-                        if sync_status != 'Synced' or health_status not in ['Healthy', 'Progressing']:
-                            all_synced = False
-                            break
-                    
-                    if all_synced:
-                        self.log("All ArgoCD applications synced successfully", "SUCCESS")
-                        return
+                # Otherwise wait on watch events rather than re-listing on a timer, tracking only
+                # the applications that haven't settled yet
+                self.log("Waiting for applications to sync...")
+                deadline = time.monotonic() + max_wait
+                pending = {name for name, status in statuses.items() if not is_settled(status)}
+                try:
+                    for event in self.watch_resources('Application', 'argoproj.io/v1alpha1', namespace='argocd', timeout=max_wait):
+                        app_name = event['object']['metadata']['name']
+                        if event['type'] == 'DELETED' or is_settled(self.app_status(event['object'])):
+                            pending.discard(app_name)
+                        else:
+                            pending.add(app_name)
+                        if not pending:
+                            self.log("All ArgoCD applications synced successfully", "SUCCESS")
+                            return
+                except Exception as e:
+                    self.log(f"Watching ArgoCD applications failed: {str(e)}", "DEBUG")
                 
-                time.sleep(10)
-            
-            self.log("Timeout waiting for ArgoCD applications to sync", "WARNING")
+                # If the watch ended early (e.g. not permitted), poll for the rest of the budget with
+                # exponential backoff: quick checks catch fast syncs, later ones back off to 10s
+                def poll():
+                    current = self.get_argocd_app_statuses()
+                    return current is not None and settled(current)
+                
+                remaining = deadline - time.monotonic()
+                if remaining > 0 and self.wait_until(poll, timeout=remaining, interval=0.5, backoff=1.7, max_interval=10):
+                    self.log("All ArgoCD applications synced successfully", "SUCCESS")
+                    return
+                
+                self.log("Timeout waiting for ArgoCD applications to sync", "WARNING")
+            finally:
+                background.shutdown(wait=True)
             
         except Exception as e:
             self.log(f"Failed to sync ArgoCD applications: {str(e)}", "WARNING")
 
-
-def main():
-    parser = argparse.ArgumentParser(
-        description="Deploy Kubernetes applications with monitoring, storage, and ingress",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+USAGE_EPILOG = """
 Examples:
   # Deploy everything (storage + monitoring + ingress)
   python3 scripts/deploy-applications.py
@@ -1420,6 +1937,15 @@ Configuration:
   The Proxmox CSI driver requires a .proxmox-csi.env file with credentials.
   If missing, a template will be created for you to fill in.
         """
+
+
+@functools.cache
+def build_parser():
+    """Build the command line parser (once per process, so in-process callers can re-invoke main())"""
+    parser = argparse.ArgumentParser(
+        description="Deploy Kubernetes applications with monitoring, storage, and ingress",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=USAGE_EPILOG
     )
     
     parser.add_argument("--storage-only", action="store_true", help="Deploy only storage integration")
@@ -1427,7 +1953,11 @@ Configuration:
     parser.add_argument("--verify-only", action="store_true", help="Only verify existing deployments")
     parser.add_argument("--skip-prerequisites", action="store_true", help="Skip prerequisites check")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
-    
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
     
     # Validate argument combinations